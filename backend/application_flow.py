@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import re
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import EmailStr, TypeAdapter, ValidationError
+
+logger = logging.getLogger(__name__)
+
+FlowResult = Tuple[str, List[str], bool, List[str]]
+
+# Patterns are compiled once at import instead of on every turn
+PHONE_SEPARATORS_PATTERN = re.compile(r'[-\s()]')
+PHONE_DIGITS_PATTERN = re.compile(r'\d{10}')
+PHONE_CLEAN_PATTERN = re.compile(r'[^\d+]')
+NAME_PREFIX_PATTERN = re.compile(r"^(?:my name is|my name's|i am|i'm|this is|it's|name:)\s+", re.IGNORECASE)
+SPOKEN_AT_PATTERN = re.compile(r'\bat\b', re.IGNORECASE)
+SPOKEN_DOT_PATTERN = re.compile(r'\bdot\b', re.IGNORECASE)
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+APPLY_PATTERN = re.compile(r'\b(?:apply|yes)\b', re.IGNORECASE)
+DIGIT_PATTERN = re.compile(r'\d')
+EDGE_PUNCTUATION_PATTERN = re.compile(r"^\W+|\W+$")
+
+# First words that mark a question, command or small talk rather than a name
+NAME_REJECT_WORDS = {
+    'i', 'my', 'the', 'a', 'an', 'can', 'could', 'what', 'how', 'why', 'when', 'where', 'who',
+    'which', 'is', 'are', 'do', 'does', 'will', 'show', 'tell', 'give', 'list', 'send', 'please',
+    'hi', 'hello', 'hey', 'yes', 'no', 'ok', 'okay', 'thanks', 'thank', 'cancel', 'stop', 'skip',
+}
+
+email_adapter = TypeAdapter(EmailStr)
+
+class ApplicationStateMachine:
+    """Per-user job application flow: position -> name -> phone -> email -> submitted.
+
+    State lives in ``CustomerInfo.conversation_context`` under the keys
+    ``application_stage``, ``collecting_info`` and ``waiting_for``. Transitions are
+    synchronous and never call the LLM; callers serialize turns for the same user
+    by holding ``lock(user_id)`` across the whole request.
+    """
+
+    def __init__(self):
+        # user_id -> [lock, number of tasks holding or waiting for it]
+        self._locks: Dict[str, List[Any]] = {}
+
+    @asynccontextmanager
+    async def lock(self, user_id: str) -> AsyncIterator[None]:
+        """Hold the lock guarding this user's conversation and customer data.
+
+        The entry is dropped once no task holds or waits for it, so the registry
+        stays bounded without ever handing a second lock to a queued user.
+        """
+        entry = self._locks.get(user_id)
+        if entry is None:
+            entry = self._locks[user_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and self._locks.get(user_id) is entry:
+                del self._locks[user_id]
+
+    @staticmethod
+    def is_collecting(customer_info: Any) -> bool:
+        return bool(customer_info.conversation_context.get("collecting_info"))
+
+    def handles_turn(self, user_input: str, customer_info: Any) -> bool:
+        """True if this turn belongs to the application flow and needs no intent classification"""
+        if self.is_collecting(customer_info):
+            # Only answers to the pending field stay local; questions and commands get classified
+            waiting_for = customer_info.conversation_context.get("waiting_for")
+            if APPLY_PATTERN.search(user_input):
+                return True
+            if waiting_for == "name":
+                return self._parse_name(user_input) is not None
+            if waiting_for == "phone":
+                return self._looks_like_phone(user_input)
+            if waiting_for == "email":
+                return self._looks_like_email(user_input)
+            return False
+        if customer_info.selected_position and not customer_info.is_complete:
+            return bool(APPLY_PATTERN.search(user_input))
+        return False
+
+    def select_position(self, customer_info: Any, job_position: Optional[str]) -> None:
+        if not customer_info.selected_position:
+            customer_info.selected_position = job_position
+            customer_info.conversation_context["application_stage"] = "show_details"
+
+    def advance(self, user_input: str, customer_info: Any) -> Optional[FlowResult]:
+        """Apply one application turn. Returns None when the input is not an answer to the current step."""
+        context = customer_info.conversation_context
+
+        if not customer_info.selected_position:
+            response_text = "Oops! It seems you haven’t picked a position yet. Please choose one from: 1. Customer Service Representative or 2. Technical Support Specialist."
+            suggestions = ["1 - Customer Service Representative", "2 - Technical Support Specialist", "Show me the list again"]
+            return response_text, suggestions, False, []
+
+        if not context.get("collecting_info"):
+            context["collecting_info"] = True
+            context["application_stage"] = "collecting"
+            context["waiting_for"] = "name"
+            response_text = f"Awesome! Let’s get you started for {customer_info.selected_position}. What’s your full name?"
+            suggestions = ["My name is [Your Full Name]", "Can I get more details?", "What’s next?"]
+            return response_text, suggestions, True, ["name"]
+
+        waiting_for = context.get("waiting_for")
+        result = None
+        if waiting_for == "name" and not customer_info.name:
+            result = self._collect_name(user_input, customer_info)
+        elif waiting_for == "phone" and not customer_info.phone:
+            result = self._collect_phone(user_input, customer_info)
+        elif waiting_for == "email" and not customer_info.email:
+            result = self._collect_email(user_input, customer_info)
+        if result is None and APPLY_PATTERN.search(user_input):
+            result = self._repeat_question(waiting_for, customer_info)
+        return result
+
+    @staticmethod
+    def _repeat_question(waiting_for: Optional[str], customer_info: Any) -> Optional[FlowResult]:
+        """Answer a repeated "apply" by asking for the pending field again"""
+        if waiting_for == "name":
+            response_text = f"You’re already applying for {customer_info.selected_position}! What’s your full name?"
+            suggestions = ["My name is [Your Full Name]", "Can I get more details?", "What’s next?"]
+        elif waiting_for == "phone":
+            response_text = f"You’re already applying for {customer_info.selected_position}! What’s your phone number?"
+            suggestions = ["My number is [phone number]", "Can we skip this?", "What’s after this?"]
+        elif waiting_for == "email":
+            response_text = f"You’re already applying for {customer_info.selected_position}! What’s your email address?"
+            suggestions = ["My email is [email address]", "Can we do this later?", "What happens next?"]
+        else:
+            return None
+        return response_text, suggestions, True, [waiting_for]
+
+    @staticmethod
+    def _parse_name(user_input: str) -> Optional[str]:
+        """Return the name in an answer like "Jane Doe" or "my name is Jane Doe", else None"""
+        raw = user_input.strip()
+        # A repeated "Yes, apply now!" (double-submit) is never a name
+        if raw.endswith('?') or DIGIT_PATTERN.search(raw) or APPLY_PATTERN.search(raw):
+            return None
+        stripped = NAME_PREFIX_PATTERN.sub('', raw)
+        name = stripped.strip().rstrip('.!')
+        if not name or len(name.split()) > 4:
+            return None
+        # Compare whole first words so names like "Alice" or "Ian" are not rejected
+        first_word = EDGE_PUNCTUATION_PATTERN.sub('', name.split()[0].lower().split("'")[0])
+        if stripped == raw and first_word in NAME_REJECT_WORDS:
+            return None
+        return name
+
+    @staticmethod
+    def _looks_like_phone(user_input: str) -> bool:
+        return bool(PHONE_DIGITS_PATTERN.search(PHONE_SEPARATORS_PATTERN.sub('', user_input)))
+
+    @staticmethod
+    def _looks_like_email(user_input: str) -> bool:
+        email_clean = SPOKEN_DOT_PATTERN.sub('.', SPOKEN_AT_PATTERN.sub('@', user_input.lower()))
+        return '@' in email_clean and '.' in email_clean
+
+    def _collect_name(self, user_input: str, customer_info: Any) -> Optional[FlowResult]:
+        name = self._parse_name(user_input)
+        if name is None:
+            return None
+
+        customer_info.name = name
+        customer_info.conversation_context["waiting_for"] = "phone"
+        response_text = f"Thanks, {customer_info.name}! What’s your phone number?"
+        suggestions = ["My number is [phone number]", "Can we skip this?", "What’s after this?"]
+        return response_text, suggestions, True, ["phone"]
+
+    def _collect_phone(self, user_input: str, customer_info: Any) -> Optional[FlowResult]:
+        if not self._looks_like_phone(user_input):
+            return None
+
+        customer_info.phone = PHONE_CLEAN_PATTERN.sub('', user_input)
+        customer_info.conversation_context["waiting_for"] = "email"
+        response_text = f"Great, {customer_info.name}! What’s your email address?"
+        suggestions = ["My email is [email address]", "Can we do this later?", "What happens next?"]
+        return response_text, suggestions, True, ["email"]
+
+    def _collect_email(self, user_input: str, customer_info: Any) -> Optional[FlowResult]:
+        if not self._looks_like_email(user_input):
+            return None
+        email_clean = user_input.lower().strip()
+        email_clean = SPOKEN_AT_PATTERN.sub('@', email_clean)
+        email_clean = SPOKEN_DOT_PATTERN.sub('.', email_clean)
+        # Keep only the address when it is embedded in a sentence ("my email is ...")
+        candidates = [token for token in email_clean.split() if '@' in token]
+        email_clean = candidates[0] if len(candidates) == 1 and '.' in candidates[0] else WHITESPACE_PATTERN.sub('', email_clean)
+
+        try:
+            customer_info.email = email_adapter.validate_python(email_clean.rstrip('.'))
+        except ValidationError:
+            response_text = "Oops, that email doesn’t look right. Try again, like john@email.com"
+            suggestions = ["My email is [email address]", "Let’s skip this", "What’s next?"]
+            return response_text, suggestions, True, ["email"]
+
+        context = customer_info.conversation_context
+        customer_info.is_complete = True
+        context["collecting_info"] = False
+        context["waiting_for"] = None
+        context["application_stage"] = "submitted"
+        logger.info(f"Application completed for position: {customer_info.selected_position}")
+        response_text = f"Nice work, {customer_info.name}! Your application for {customer_info.selected_position} is submitted:\n- Name: {customer_info.name}\n- Phone: {customer_info.phone}\n- Email: {customer_info.email}\nOur team will reach out within 3-5 days. Best of luck!"
+        suggestions = ["Thanks!", "When will I hear back?", "Can I apply for another role?"]
+        return response_text, suggestions, False, []
@@ -0,0 +1,215 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class ApplicationSink:
+    """Durable store for completed job applications.
+
+    ``submit`` only enqueues; a background task drains the bounded queue in
+    batches (by size or age) into SQLite running in WAL mode, so the chat path
+    never waits on disk. Failed batches are retried with backoff and kept in
+    memory until they are written. ``stop`` drains everything still queued.
+    Applications that cannot be queued or written are appended to a spill file
+    next to the database (``<db_path>.spill.jsonl``); logs only carry user ids.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 100, flush_interval: float = 0.5,
+                 max_queue_size: int = 10000, submit_timeout: float = 1.0, max_retries: int = 5):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.submit_timeout = submit_timeout
+        self.max_retries = max_retries
+        self.spill_path = f"{db_path}.spill.jsonl"
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        # Applications taken off the queue but not yet written; survives a worker restart
+        self._pending: List[Dict[str, Any]] = []
+        self._stopping = False
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._stopping = False
+        await asyncio.to_thread(self._open)
+        self._start_worker()
+        logger.info(f"Application sink started: {self.db_path}")
+
+    async def stop(self) -> None:
+        """Flush every queued application and close the database"""
+        if self._queue is None:
+            return
+        self._stopping = True
+        worker = self._worker
+        if worker is not None:
+            # Only block on the sentinel while a live worker is draining the queue
+            while not worker.done():
+                try:
+                    self._queue.put_nowait(None)
+                    break
+                except asyncio.QueueFull:
+                    await asyncio.sleep(self.flush_interval / 10)
+            await asyncio.gather(worker, return_exceptions=True)
+            self._worker = None
+
+        # Whatever a crashed worker left behind gets one last attempt
+        self._take_queued()
+        await self._flush_pending()
+        if self._pending:
+            await self._spill(self._pending, "not persisted on shutdown")
+        self._pending = []
+        self._queue = None
+        await asyncio.to_thread(self._close)
+        logger.info("Application sink drained and closed")
+
+    async def submit(self, application: Dict[str, Any]) -> bool:
+        """Queue an application for writing. Waits at most ``submit_timeout`` when the queue is full."""
+        if self._queue is None or self._stopping:
+            await self._spill([application], "sink not running")
+            return False
+        try:
+            self._queue.put_nowait(application)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self._queue.put(application), timeout=self.submit_timeout)
+            except asyncio.TimeoutError:
+                await self._spill([application], "queue full")
+                return False
+        return True
+
+    def _start_worker(self) -> None:
+        self._worker = asyncio.create_task(self._run())
+        self._worker.add_done_callback(self._on_worker_done)
+
+    def _on_worker_done(self, task: asyncio.Task) -> None:
+        if task.cancelled() or task.exception() is None:
+            return
+        logger.error("Application sink worker crashed", exc_info=task.exception())
+        if not self._stopping:
+            logger.info("Restarting application sink worker")
+            self._start_worker()
+
+    def _take_queued(self) -> None:
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                self._pending.append(item)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            deadline = loop.time() + self.flush_interval
+            while len(self._pending) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                self._pending.append(item)
+
+            if stopping:
+                self._take_queued()
+            await self._flush_pending()
+
+    async def _flush_pending(self) -> None:
+        """Write pending applications in batch_size chunks; a failing chunk stays pending for the next cycle"""
+        while self._pending:
+            batch = self._pending[:self.batch_size]
+            if not await self._flush(batch):
+                break
+            del self._pending[:len(batch)]
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> bool:
+        delay = 0.1
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+                return True
+            except Exception as e:
+                logger.warning(f"Application sink write failed (attempt {attempt}/{self.max_retries}): {str(e)}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 5.0)
+        logger.error(f"Application sink giving up on batch of {len(batch)} for now")
+        return False
+
+    async def _spill(self, applications: List[Dict[str, Any]], reason: str) -> None:
+        """Keep applications that missed the database out of the shared log"""
+        user_ids = ", ".join(str(application.get("user_id")) for application in applications)
+        try:
+            await asyncio.to_thread(self._write_spill, applications)
+            logger.error(f"Application sink {reason}: {len(applications)} application(s) spilled to "
+                         f"{self.spill_path} (user_ids: {user_ids})")
+        except OSError as e:
+            logger.error(f"Application sink {reason}: lost {len(applications)} application(s) "
+                         f"(user_ids: {user_ids}); spill failed: {str(e)}")
+
+    def _write_spill(self, applications: List[Dict[str, Any]]) -> None:
+        fd = os.open(self.spill_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        with os.fdopen(fd, "a") as spill:
+            for application in applications:
+                spill.write(self._dumps(application) + "\n")
+            spill.flush()
+            os.fsync(spill.fileno())
+
+    @staticmethod
+    def _dumps(application: Dict[str, Any]) -> str:
+        return json.dumps(application, default=str)
+
+    def _open(self) -> None:
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS applications (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                position TEXT,
+                name TEXT,
+                phone TEXT,
+                email TEXT,
+                submitted_at TEXT NOT NULL,
+                payload TEXT NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        rows = [
+            (
+                application.get("user_id"),
+                application.get("position"),
+                application.get("name"),
+                application.get("phone"),
+                application.get("email"),
+                application.get("submitted_at"),
+                self._dumps(application),
+            )
+            for application in batch
+        ]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO applications (user_id, position, name, phone, email, submitted_at, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
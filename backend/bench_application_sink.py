@@ -0,0 +1,55 @@
+"""Throughput benchmark for ApplicationSink.
+
+Usage: python bench_application_sink.py [--count 20000] [--concurrency 500] [--batch-size 100]
+
+Submits ``count`` applications from ``concurrency`` tasks against a temporary
+SQLite database and reports submit rate (what the chat path sees) and end-to-end
+rate including the shutdown drain.
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+
+from application_sink import ApplicationSink
+
+async def run(count: int, concurrency: int, batch_size: int, flush_interval: float) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "applications.db")
+        sink = ApplicationSink(db_path, batch_size=batch_size, flush_interval=flush_interval)
+        await sink.start()
+
+        async def submitter(worker: int):
+            for i in range(worker, count, concurrency):
+                await sink.submit({
+                    "user_id": f"user-{i}",
+                    "position": "Customer Service Representative",
+                    "name": "Jane Doe",
+                    "phone": "5550100000",
+                    "email": f"jane{i}@example.com",
+                    "submitted_at": "2025-01-01T00:00:00"
+                })
+
+        started = time.perf_counter()
+        await asyncio.gather(*(submitter(worker) for worker in range(concurrency)))
+        submitted = time.perf_counter()
+        await sink.stop()
+        drained = time.perf_counter()
+
+        with sqlite3.connect(db_path) as conn:
+            stored = conn.execute("SELECT COUNT(*) FROM applications").fetchone()[0]
+
+    print(f"applications: {count}  stored: {stored}  batch_size: {batch_size}")
+    print(f"submit:     {count / (submitted - started):>10,.0f} /s")
+    print(f"end-to-end: {count / (drained - started):>10,.0f} /s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--flush-interval", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(run(args.count, args.concurrency, args.batch_size, args.flush_interval))
@@ -0,0 +1,87 @@
+"""Bandwidth and CPU per request for /chat and /conversation.
+
+Usage: python bench_endpoints.py [--requests 200] [--history 200]
+
+Runs the app in-process with a stubbed LLM (no network, no API key needed) and
+reports, per endpoint, the body size without compression, with gzip, and the
+CPU time per request. CPU is measured with time.process_time around in-process
+requests, so it includes test-client overhead and is best read comparatively.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import time
+import types
+
+os.environ.setdefault("GROQ_API_KEY", "bench-key")
+
+from fastapi.testclient import TestClient
+
+import main
+
+class StubLLM:
+    def __init__(self):
+        self.chat = types.SimpleNamespace(completions=self)
+
+    async def create(self, model, messages, **params):
+        await asyncio.sleep(0)
+        if "intent classification" in messages[0]["content"]:
+            content = json.dumps({"intent": "service_inquiry", "confidence": 0.9, "entities": {}})
+        else:
+            content = ("CCI Global offers omnichannel customer care, technical support and digital "
+                       "transformation services across several countries. How else can I help?")
+        message = types.SimpleNamespace(content=content)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+def measure(client: TestClient, count: int, method: str, url: str, **kwargs):
+    """Return (identity bytes, gzip bytes, ms CPU per request) for one endpoint"""
+    headers = kwargs.pop("headers", {})
+    identity = client.request(method, url, headers={**headers, "Accept-Encoding": "identity"}, **kwargs)
+    compressed = client.request(method, url, headers={**headers, "Accept-Encoding": "gzip"}, **kwargs)
+    wire_bytes = len(compressed.content)
+    if compressed.headers.get("content-encoding") == "gzip":
+        wire_bytes = len(gzip.compress(compressed.content))  # httpx already decoded the body
+
+    started = time.process_time()
+    for _ in range(count):
+        client.request(method, url, headers={**headers, "Accept-Encoding": "gzip"}, **kwargs)
+    cpu_ms = (time.process_time() - started) * 1000 / count
+    return identity.status_code, len(identity.content), wire_bytes, cpu_ms
+
+def main_bench(count: int, history: int) -> None:
+    main.model_router.client = StubLLM()
+    client = TestClient(main.app)
+
+    user_id = "bench-user"
+    for i in range(history // 2):
+        client.post("/chat", json={"message": f"Tell me about your services ({i})", "user_id": user_id})
+
+    # Shape the old endpoint returned: the whole history plus the full CustomerInfo
+    legacy = json.dumps({
+        "messages": main.conversations[user_id],
+        "customer_info": main.customer_data[user_id].model_dump(mode="json")
+    }).encode()
+
+    etag = client.get(f"/conversation/{user_id}").headers["etag"]
+    rows = [
+        ("POST /chat", measure(client, count, "POST", "/chat",
+                               json={"message": "What services do you offer?", "user_id": "bench-chat"})),
+        ("GET /conversation (page of 50)", measure(client, count, "GET", f"/conversation/{user_id}")),
+        ("GET /conversation (304)", measure(client, count, "GET", f"/conversation/{user_id}",
+                                            headers={"If-None-Match": etag})),
+    ]
+
+    print(f"history: {len(main.conversations[user_id])} messages; old unpaginated body: {len(legacy):,} bytes "
+          f"({len(gzip.compress(legacy)):,} gzipped)")
+    print(f"{'endpoint':34} {'status':>6} {'identity B':>11} {'gzip B':>9} {'CPU ms/req':>11}")
+    for name, (status, identity_bytes, wire_bytes, cpu_ms) in rows:
+        print(f"{name:34} {status:>6} {identity_bytes:>11,} {wire_bytes:>9,} {cpu_ms:>11.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--history", type=int, default=200)
+    args = parser.parse_args()
+    main_bench(args.requests, args.history)
@@ -1,16 +1,23 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from speech_service import SpeechService
+from application_flow import ApplicationStateMachine
+from application_sink import ApplicationSink
+from model_router import ModelRouter
 from openai import AsyncOpenAI
-from pydantic import BaseModel, EmailStr, ValidationError
+from pydantic import BaseModel, EmailStr
 from typing import List, Dict, Any, Optional
 import uvicorn
 import openai
 from datetime import datetime
 import json
 import re
+import hashlib
+import uuid
 import logging
 from functools import lru_cache
+from contextlib import asynccontextmanager
 import os
 from dotenv import load_dotenv
 
@@ -20,7 +27,20 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="CCI Global Dynamic Chatbot API", version="5.1.0")
+# Completed applications are persisted off the request path
+application_sink = ApplicationSink(
+    db_path=os.getenv("APPLICATION_DB_PATH", "applications.db"),
+    batch_size=int(os.getenv("APPLICATION_SINK_BATCH_SIZE", "100")),
+    flush_interval=float(os.getenv("APPLICATION_SINK_FLUSH_INTERVAL", "0.5"))
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await application_sink.start()
+    yield
+    await application_sink.stop()
+
+app = FastAPI(title="CCI Global Dynamic Chatbot API", version="5.1.0", lifespan=lifespan)
 
 # Groq API configuration
 openai.api_key = os.getenv("GROQ_API_KEY")
@@ -31,6 +51,9 @@ client = AsyncOpenAI(
     base_url=os.getenv("GROQ_API_BASE")
 )
 
+# Picks the small or large Groq model per call (see model_router.py)
+model_router = ModelRouter(client)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -38,8 +61,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# Compress larger payloads (conversation history, inline audio) for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=int(os.getenv("GZIP_MINIMUM_SIZE", "500")))
+
 # Pydantic models
 class CustomerInfo(BaseModel):
     name: Optional[str] = None
@@ -69,9 +96,19 @@ class ChatResponse(BaseModel):
     intent: Optional[str] = None
     confidence: Optional[float] = None
 
+class ConversationPage(BaseModel):
+    messages: List[Dict[str, Any]]
+    customer_info: CustomerInfo
+    next_cursor: str
+    has_more: bool
+    # True when the cursor belonged to a cleared history; the page restarts from the beginning
+    reset: bool = False
+
 # In-memory storage
 conversations: Dict[str, List[Dict[str, Any]]] = {}
 customer_data: Dict[str, CustomerInfo] = {}
+# Changes whenever a user's history is (re)created, so stale cursors can be detected
+conversation_generations: Dict[str, str] = {}
 
 # Load knowledge base from JSON file
 @lru_cache(maxsize=1)
@@ -86,14 +123,13 @@ def get_knowledge_base() -> Dict[str, Any]:
         logger.error("Invalid JSON in knowledge base file")
         raise HTTPException(status_code=500, detail="Invalid knowledge base format")
 
+CLASSIFICATION_MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.6"))
+
 class IntentClassifier:
     """Dynamic intent classification for CCI Global chatbot"""
     
     def __init__(self, knowledge_base: Dict[str, Any]):
-        self.client = AsyncOpenAI(
-            api_key=os.getenv("GROQ_API_KEY"),
-            base_url=os.getenv("GROQ_API_BASE")
-        )
+        self.router = model_router
         self.knowledge_base = knowledge_base
     
     async def classify_intent(self, user_input: str, conversation_history: List[Dict]) -> Dict[str, Any]:
@@ -171,17 +207,18 @@ Guidelines:
 - other: anything else"""
 
         try:
-            response = await self.client.chat.completions.create(
-                model="llama3-70b-8192",
+            result = await self.router.complete(
+                "classification",
                 messages=[
                     {"role": "system", "content": "You are an intent classification system. Return only valid JSON."},
                     {"role": "user", "content": prompt}
                 ],
+                user_input=user_input,
+                validate=self._parse_classification,
+                escalate_if=self._low_confidence,
                 temperature=0.3,
                 max_tokens=200
             )
-            
-            result = json.loads(response.choices[0].message.content.strip())
             return result
             
         except Exception as e:
@@ -194,6 +231,25 @@ Guidelines:
                 "suggested_response_type": "conversational"
             }
 
+    @staticmethod
+    def _parse_classification(content: str) -> Dict[str, Any]:
+        """Parse classifier output; raising ValueError lets the router escalate to the large model"""
+        result = json.loads(content)  # JSONDecodeError is a ValueError
+        if not isinstance(result, dict) or "intent" not in result:
+            raise ValueError("classification missing intent")
+        return result
+    
+    @staticmethod
+    def _low_confidence(result: Dict[str, Any]) -> Optional[str]:
+        """Reason to re-ask the large model about a small-model classification, if any"""
+        try:
+            confidence = float(result.get("confidence") or 0)
+        except (TypeError, ValueError):
+            return f"unreadable classification confidence: {result.get('confidence')}"
+        if confidence < CLASSIFICATION_MIN_CONFIDENCE:
+            return f"low classification confidence: {confidence}"
+        return None
+
 class DynamicChatbotEngine:
     """Fully dynamic LLM-driven chatbot for CCI Global"""
     
@@ -201,6 +257,7 @@ class DynamicChatbotEngine:
         self.knowledge_base = get_knowledge_base()
         self.intent_classifier = IntentClassifier(self.knowledge_base)
         self.voice_service = SpeechService()
+        self.application_flow = ApplicationStateMachine()
         
     def format_all_positions(self) -> str:
         """Format all available positions concisely"""
@@ -248,9 +305,7 @@ class DynamicChatbotEngine:
             job_position = entities.get("job_position")
             position_key = entities.get("position_key")
             
-            if not customer_info.selected_position:
-                customer_info.selected_position = job_position
-                customer_info.conversation_context["application_stage"] = "show_details"
+            self.application_flow.select_position(customer_info, job_position)
             
             available_positions = self.knowledge_base.get("careers", {}).get("available_positions", {})
             position_data = available_positions.get(position_key, {})
@@ -261,56 +316,9 @@ class DynamicChatbotEngine:
                 return response_text, suggestions, False, []
         
         elif intent == "application_continue":
-            if not customer_info.selected_position:
-                response_text = "Oops! It seems you haven’t picked a position yet. Please choose one from: 1. Customer Service Representative or 2. Technical Support Specialist."
-                suggestions = ["1 - Customer Service Representative", "2 - Technical Support Specialist", "Show me the list again"]
-                return response_text, suggestions, False, []
-            
-            if not customer_info.conversation_context.get("collecting_info"):
-                customer_info.conversation_context["collecting_info"] = True
-                customer_info.conversation_context["waiting_for"] = "name"
-                response_text = f"Awesome! Let’s get you started for {customer_info.selected_position}. What’s your full name?"
-                suggestions = ["My name is [Your Full Name]", "Can I get more details?", "What’s next?"]
-                return response_text, suggestions, True, ["name"]
-            
-            if customer_info.conversation_context.get("collecting_info"):
-                waiting_for = customer_info.conversation_context.get("waiting_for")
-                
-                if waiting_for == "name" and not customer_info.name:
-                    if len(user_input.split()) <= 4 and not user_input.lower().startswith(('i', 'my', 'the', 'a', 'can', 'what', 'how')):
-                        customer_info.name = user_input.strip()
-                        customer_info.conversation_context["waiting_for"] = "phone"
-                        response_text = f"Thanks, {customer_info.name}! What’s your phone number?"
-                        suggestions = ["My number is [phone number]", "Can we skip this?", "What’s after this?"]
-                        return response_text, suggestions, True, ["phone"]
-                
-                elif waiting_for == "phone" and not customer_info.phone:
-                    phone_match = re.search(r'\d{10}', user_input.replace('-', '').replace(' ', '').replace('(', '').replace(')', ''))
-                    if phone_match:
-                        customer_info.phone = re.sub(r'[^\d+]', '', user_input)
-                        customer_info.conversation_context["waiting_for"] = "email"
-                        response_text = f"Great, {customer_info.name}! What’s your email address?"
-                        suggestions = ["My email is [email address]", "Can we do this later?", "What happens next?"]
-                        return response_text, suggestions, True, ["email"]
-                
-                elif waiting_for == "email" and not customer_info.email:
-                    if '@' in user_input and '.' in user_input:
-                        try:
-                            email_clean = user_input.lower().strip()
-                            email_clean = re.sub(r'\bat\b', '@', email_clean, flags=re.IGNORECASE)
-                            email_clean = re.sub(r'\bdot\b', '.', email_clean)
-                            email_clean = re.sub(r'\s+', '', email_clean)
-                            customer_info.email = EmailStr(email_clean)
-                            customer_info.is_complete = True
-                            customer_info.conversation_context["collecting_info"] = False
-                            customer_info.conversation_context["waiting_for"] = None
-                            response_text = f"Nice work, {customer_info.name}! Your application for {customer_info.selected_position} is submitted:\n- Name: {customer_info.name}\n- Phone: {customer_info.phone}\n- Email: {customer_info.email}\nOur team will reach out within 3-5 days. Best of luck!"
-                            suggestions = ["Thanks!", "When will I hear back?", "Can I apply for another role?"]
-                            return response_text, suggestions, False, []
-                        except ValidationError:
-                            response_text = f"Oops, that email doesn’t look right. Try again, like john@email.com"
-                            suggestions = ["My email is [email address]", "Let’s skip this", "What’s next?"]
-                            return response_text, suggestions, True, ["email"]
+            flow_result = self.application_flow.advance(user_input, customer_info)
+            if flow_result is not None:
+                return flow_result
         
         return await self._generate_llm_response(user_input, customer_info, conversation_history, intent_data)
     
@@ -331,6 +339,7 @@ class DynamicChatbotEngine:
         }
         
         system_prompt = system_prompts.get(intent, system_prompts["other"])
+        knowledge_text = json.dumps(relevant_kb, indent=2)
         
         prompt = f"""{system_prompt}
 
@@ -340,7 +349,7 @@ CONVERSATION CONTEXT:
 {context}
 
 CCI GLOBAL KNOWLEDGE BASE:
-{json.dumps(relevant_kb, indent=2)}
+{knowledge_text}
 
 RESPONSE GUIDELINES:
 1. Be conversational and friendly
@@ -353,17 +362,19 @@ RESPONSE GUIDELINES:
 8. Adapt responses based on the current conversation stage (e.g., position selection, application)"""
 
         try:
-            response = await client.chat.completions.create(
-                model="llama3-70b-8192",
+            response_text = await model_router.complete(
+                "response",
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": prompt}
                 ],
+                intent=intent,
+                user_input=user_input,
+                context_chars=len(context) + len(knowledge_text),
+                validate=self._validate_response_text,
                 temperature=0.7,
                 max_tokens=250
             )
-            
-            response_text = response.choices[0].message.content.strip()
             suggestions = await self._generate_dynamic_suggestions(user_input, response_text, intent_data)
             
             return response_text, suggestions, False, []
@@ -377,6 +388,12 @@ RESPONSE GUIDELINES:
                 []
             )
     
+    @staticmethod
+    def _validate_response_text(content: str) -> str:
+        if not content:
+            raise ValueError("empty response")
+        return content
+    
     def _build_conversation_context(self, history: List[Dict], customer_info: CustomerInfo) -> str:
         context_parts = []
         if customer_info.name or customer_info.email or customer_info.phone or customer_info.selected_position:
@@ -440,7 +457,17 @@ RESPONSE GUIDELINES:
     async def get_response(self, user_input: str, customer_info: CustomerInfo, user_id: str) -> tuple[str, List[str], bool, List[str]]:
         try:
             conversation_history = conversations.get(user_id, [])
-            intent_data = await self.intent_classifier.classify_intent(user_input, conversation_history)
+            if self.application_flow.handles_turn(user_input, customer_info):
+                # Application steps are resolved locally; skip the classifier round-trip
+                intent_data = {
+                    "intent": "application_continue",
+                    "confidence": 1.0,
+                    "entities": {},
+                    "requires_info_collection": True,
+                    "suggested_response_type": "application_step"
+                }
+            else:
+                intent_data = await self.intent_classifier.classify_intent(user_input, conversation_history)
             
             response_text, suggested_questions, needs_info, missing_fields = await self.generate_dynamic_response(
                 user_input, customer_info, user_id, intent_data
@@ -463,6 +490,18 @@ RESPONSE GUIDELINES:
 chatbot = DynamicChatbotEngine()
 voice_service = SpeechService()
 
+def json_response(body: bytes, request: Optional[Request] = None) -> Response:
+    """Wrap pre-serialized JSON; with a request, add an ETag and answer matching If-None-Match with 304"""
+    if request is None:
+        return Response(content=body, media_type="application/json")
+
+    etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+    if "*" in if_none_match or etag in if_none_match:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 def correct_email_pattern(text: str) -> str:
     if not text or not isinstance(text, str):
         return text
@@ -508,35 +547,53 @@ async def chat(message: ChatMessage):
             logger.info(f"Converted speech to text: {user_message}")
             user_message = correct_email_pattern(user_message)
 
-        if user_id not in conversations:
-            conversations[user_id] = []
-        if user_id not in customer_data:
-            customer_data[user_id] = CustomerInfo()
-
-        conversations[user_id].append({
-            "role": "user",
-            "content": user_message,
-            "timestamp": datetime.now().isoformat()
-        })
+        # Serialize turns per user so concurrent requests cannot interleave application steps
+        async with chatbot.application_flow.lock(user_id):
+            if user_id not in conversations:
+                conversations[user_id] = []
+                conversation_generations[user_id] = uuid.uuid4().hex[:8]
+            if user_id not in customer_data:
+                customer_data[user_id] = CustomerInfo()
+
+            conversations[user_id].append({
+                "role": "user",
+                "content": user_message,
+                "timestamp": datetime.now().isoformat()
+            })
+
+            customer_info = customer_data[user_id]
+            was_complete = customer_info.is_complete
+            response_text, suggestions, requires_info, missing_fields = await chatbot.get_response(
+                user_message, customer_info, user_id
+            )
 
-        customer_info = customer_data[user_id]
-        response_text, suggestions, requires_info, missing_fields = await chatbot.get_response(
-            user_message, customer_info, user_id
-        )
+            conversations[user_id].append({
+                "role": "assistant",
+                "content": response_text,
+                "timestamp": datetime.now().isoformat()
+            })
+
+            intent_info = customer_info.conversation_context.get("last_intent", {})
+            info_complete = customer_info.is_complete
+            completed_application = None
+            if info_complete and not was_complete:
+                completed_application = {
+                    "user_id": user_id,
+                    "position": customer_info.selected_position,
+                    "name": customer_info.name,
+                    "phone": customer_info.phone,
+                    "email": customer_info.email,
+                    "submitted_at": datetime.now().isoformat()
+                }
+
+        if completed_application:
+            await application_sink.submit(completed_application)
 
         audio_response = None
         if message.generate_tts:
             audio_response = voice_service.text_to_speech(response_text, voice=message.tts_voice)
 
-        conversations[user_id].append({
-            "role": "assistant",
-            "content": response_text,
-            "timestamp": datetime.now().isoformat()
-        })
-
-        intent_info = customer_info.conversation_context.get("last_intent", {})
-
-        return ChatResponse(
+        chat_response = ChatResponse(
             response=response_text,
             transcribed_text=user_message,
             timestamp=datetime.now().isoformat(),
@@ -544,26 +601,53 @@ async def chat(message: ChatMessage):
             requires_customer_info=requires_info,
             missing_fields=missing_fields,
             audio_response=audio_response,
-            customer_info_complete=customer_info.is_complete,
+            customer_info_complete=info_complete,
             intent=intent_info.get("intent"),
             confidence=intent_info.get("confidence")
         )
+        # Serialize with pydantic-core directly and omit empty optional fields
+        return json_response(chat_response.model_dump_json(exclude_none=True).encode())
 
     except Exception as e:
         logger.error(f"Chat error: {str(e)}")
         raise HTTPException(status_code=500, detail="An error occurred while processing your request.")
 
 @app.get("/conversation/{user_id}")
-async def get_conversation(user_id: str):
-    return {
-        "messages": conversations.get(user_id, []),
-        "customer_info": customer_data.get(user_id, CustomerInfo())
-    }
+async def get_conversation(request: Request, user_id: str,
+                           after: Optional[str] = Query(None, description="Cursor returned as next_cursor by the previous page"),
+                           limit: int = Query(50, ge=1, le=200)):
+    messages = conversations.get(user_id, [])
+    generation = conversation_generations.get(user_id, "0")
+
+    offset, reset = 0, False
+    if after:
+        cursor_generation, _, cursor_offset = after.partition(".")
+        if not cursor_offset.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        offset = int(cursor_offset)
+        if cursor_generation != generation or offset > len(messages):
+            offset, reset = 0, True
+
+    page = messages[offset:offset + limit]
+    next_offset = offset + len(page)
+    conversation_page = ConversationPage(
+        messages=page,
+        customer_info=customer_data.get(user_id) or CustomerInfo(),
+        next_cursor=f"{generation}.{next_offset}",
+        has_more=next_offset < len(messages),
+        reset=reset
+    )
+    body = conversation_page.model_dump_json(
+        exclude={"customer_info": {"conversation_context": {"last_intent"}}}
+    ).encode()
+    return json_response(body, request)
 
 @app.delete("/users/{user_id}")
 async def clear_users(user_id: str):
-    conversations[user_id] = []
-    customer_data[user_id] = CustomerInfo()
+    async with chatbot.application_flow.lock(user_id):
+        conversations[user_id] = []
+        conversation_generations[user_id] = uuid.uuid4().hex[:8]
+        customer_data[user_id] = CustomerInfo()
     return {"message": "Conversation cleared"}
 
 @app.get("/health")
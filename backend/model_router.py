@@ -0,0 +1,123 @@
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SMALL = "small"
+LARGE = "large"
+
+# Intents whose replies are short and need little knowledge-base context
+SIMPLE_INTENTS = ("greeting", "other")
+
+class ModelRouter:
+    """Choose a model tier per LLM call and escalate to the large tier when needed.
+
+    Classification always starts on the small model. Response generation uses the
+    small model for simple intents with short input and little context, and the
+    large model otherwise; when the large tier's observed latency is above the
+    SLO, mid-sized turns are kept on the small model as well, except for one probe
+    turn per ``probe_interval_s`` that refreshes the large-tier measurement. A
+    latency sample taken after a gap that long replaces the moving average
+    instead of being blended into it. Any small-tier call
+    whose output fails ``validate`` or trips ``escalate_if`` is retried once on the
+    large model.
+    """
+
+    def __init__(self, client: Any):
+        self.client = client
+        self.models = {
+            SMALL: os.getenv("GROQ_SMALL_MODEL", "llama-3.1-8b-instant"),
+            LARGE: os.getenv("GROQ_LARGE_MODEL", "llama3-70b-8192"),
+        }
+        self.latency_slo_ms = float(os.getenv("ROUTER_LATENCY_SLO_MS", "1500"))
+        self.max_small_input_chars = int(os.getenv("ROUTER_MAX_SMALL_INPUT_CHARS", "200"))
+        self.max_small_context_chars = int(os.getenv("ROUTER_MAX_SMALL_CONTEXT_CHARS", "4000"))
+        self.probe_interval_s = float(os.getenv("ROUTER_PROBE_INTERVAL_S", "30"))
+        self.clock = time.monotonic
+        self._last_sample_at: Dict[str, Optional[float]] = {tier: None for tier in self.models}
+        self._last_probe_at: Optional[float] = None
+        self.stats: Dict[str, Dict[str, float]] = {
+            tier: {"calls": 0, "escalations": 0, "ewma_latency_ms": 0.0, "prompt_tokens": 0, "completion_tokens": 0}
+            for tier in self.models
+        }
+
+    def choose_tier(self, task: str, intent: Optional[str] = None, user_input: str = "",
+                    context_chars: int = 0) -> str:
+        if task == "classification":
+            return SMALL
+
+        short_input = len(user_input) <= self.max_small_input_chars
+        small_context = context_chars <= self.max_small_context_chars
+        if intent in SIMPLE_INTENTS and short_input and small_context:
+            return SMALL
+
+        large_latency = self.stats[LARGE]["ewma_latency_ms"]
+        if large_latency > self.latency_slo_ms and short_input and context_chars <= 2 * self.max_small_context_chars:
+            now = self.clock()
+            last_seen = [t for t in (self._last_sample_at[LARGE], self._last_probe_at) if t is not None]
+            if last_seen and now - max(last_seen) < self.probe_interval_s:
+                return SMALL
+            # The over-SLO figure is stale; let this turn re-measure the large tier
+            self._last_probe_at = now
+            logger.info(f"Router probing {self.models[LARGE]} (last ewma {large_latency:.0f}ms)")
+        return LARGE
+
+    async def complete(self, task: str, messages: List[Dict[str, str]], *, intent: Optional[str] = None,
+                       user_input: str = "", context_chars: int = 0,
+                       validate: Optional[Callable[[str], Any]] = None,
+                       escalate_if: Optional[Callable[[Any], Optional[str]]] = None, **params) -> Any:
+        """Run a chat completion on the routed tier and return ``validate(content)`` (or the raw content).
+
+        ``validate`` should raise ``ValueError`` for unusable output; on the small tier
+        that triggers one retry on the large model, on the large tier it propagates.
+        ``escalate_if`` returns a reason to distrust a valid small-tier result (e.g. low
+        confidence); it is never applied to the large tier, whose valid output is final.
+        """
+        tier = self.choose_tier(task, intent, user_input, context_chars)
+        content = await self._call(tier, task, messages, **params)
+        if validate is None:
+            return content
+
+        try:
+            result = validate(content)
+            reason = escalate_if(result) if escalate_if is not None and tier == SMALL else None
+            if reason is None:
+                return result
+        except ValueError as e:
+            if tier == LARGE:
+                raise
+            reason = str(e)
+
+        self.stats[SMALL]["escalations"] += 1
+        logger.info(f"Router escalating {task} to {self.models[LARGE]}: {reason}")
+        content = await self._call(LARGE, task, messages, **params)
+        return validate(content)
+
+    async def _call(self, tier: str, task: str, messages: List[Dict[str, str]], **params) -> str:
+        model = self.models[tier]
+        started = self.clock()
+        response = await self.client.chat.completions.create(model=model, messages=messages, **params)
+        now = self.clock()
+        latency_ms = (now - started) * 1000
+
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+
+        tier_stats = self.stats[tier]
+        tier_stats["calls"] += 1
+        tier_stats["prompt_tokens"] += prompt_tokens
+        tier_stats["completion_tokens"] += completion_tokens
+        previous = tier_stats["ewma_latency_ms"]
+        last_sample = self._last_sample_at[tier]
+        stale = last_sample is None or now - last_sample >= self.probe_interval_s
+        tier_stats["ewma_latency_ms"] = latency_ms if stale else 0.8 * previous + 0.2 * latency_ms
+        self._last_sample_at[tier] = now
+
+        logger.info(
+            f"LLM call task={task} tier={tier} model={model} latency_ms={latency_ms:.0f} "
+            f"prompt_tokens={prompt_tokens} completion_tokens={completion_tokens}"
+        )
+        return (response.choices[0].message.content or "").strip()
@@ -0,0 +1,139 @@
+"""Offline small-vs-large model comparison over a replay corpus.
+
+Usage: python replay_model_router.py CORPUS.jsonl [--json]
+
+Each corpus line is a JSON object: {"message": "...", "history": [{"role": "user",
+"content": "..."}, ...], "intent": "optional expected label"}. Every message is
+classified with the real IntentClassifier prompt on both tiers (no escalation),
+and the report gives per-tier latency, tokens, invalid outputs, small/large
+agreement (and accuracy when labels are present), plus the tier the router
+would pick for the response turn. Needs GROQ_API_KEY / GROQ_API_BASE, like the app.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+
+import main
+from model_router import LARGE, SMALL, ModelRouter
+
+class PinnedRouter(ModelRouter):
+    """Sends every call to one tier and never escalates, for side-by-side comparison"""
+
+    def __init__(self, client: Any, tier: str):
+        super().__init__(client)
+        self.tier = tier
+        self.invalid = 0
+
+    async def complete(self, task: str, messages: List[Dict[str, str]], *, validate=None, escalate_if=None,
+                       intent: Optional[str] = None, user_input: str = "", context_chars: int = 0, **params) -> Any:
+        content = await self._call(self.tier, task, messages, **params)
+        if validate is None:
+            return content
+        try:
+            return validate(content)
+        except ValueError:
+            self.invalid += 1
+            raise
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    with open(path) as corpus:
+        return [json.loads(line) for line in corpus if line.strip()]
+
+async def replay(corpus: List[Dict[str, Any]], client: Any) -> Dict[str, Any]:
+    classifier = main.IntentClassifier(main.chatbot.knowledge_base)
+    routers = {tier: PinnedRouter(client, tier) for tier in (SMALL, LARGE)}
+    live_router = ModelRouter(client)
+    latencies: Dict[str, List[float]] = {SMALL: [], LARGE: []}
+    rows = []
+
+    for turn in corpus:
+        message, history = turn["message"], turn.get("history", [])
+        intents = {}
+        llm_classified = False
+        for tier, router in routers.items():
+            calls_before = router.stats[tier]["calls"]
+            classifier.router = router
+            started = time.perf_counter()
+            intents[tier] = (await classifier.classify_intent(message, history)).get("intent")
+            # Career keywords are answered by rules before any model call
+            if router.stats[tier]["calls"] > calls_before:
+                latencies[tier].append((time.perf_counter() - started) * 1000)
+                llm_classified = True
+
+        # Tier the live router would pick for the reply, using the large model's intent as ground truth
+        history_context = main.chatbot._build_conversation_context(history, main.CustomerInfo())
+        knowledge = main.chatbot._extract_relevant_knowledge(intents[LARGE], {})
+        context_chars = len(history_context) + len(json.dumps(knowledge, indent=2))
+        response_tier = live_router.choose_tier("response", intents[LARGE], message, context_chars)
+
+        rows.append({
+            "message": message,
+            "expected": turn.get("intent"),
+            "small": intents[SMALL],
+            "large": intents[LARGE],
+            "rule_based": not llm_classified,
+            "response_tier": response_tier,
+        })
+
+    return summarize(rows, routers, latencies)
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def summarize(rows: List[Dict[str, Any]], routers: Dict[str, PinnedRouter],
+              latencies: Dict[str, List[float]]) -> Dict[str, Any]:
+    llm_rows = [row for row in rows if not row["rule_based"]]
+    labelled = [row for row in llm_rows if row["expected"]]
+    tiers = {}
+    for tier, router in routers.items():
+        stats = router.stats[tier]
+        tiers[tier] = {
+            "model": router.models[tier],
+            "calls": stats["calls"],
+            "invalid_outputs": router.invalid,
+            "latency_ms_p50": percentile(latencies[tier], 0.5),
+            "latency_ms_p95": percentile(latencies[tier], 0.95),
+            "latency_ms_mean": statistics.fmean(latencies[tier]) if latencies[tier] else None,
+            "prompt_tokens": stats["prompt_tokens"],
+            "completion_tokens": stats["completion_tokens"],
+            "accuracy": (sum(row[tier] == row["expected"] for row in labelled) / len(labelled)) if labelled else None,
+        }
+    return {
+        "turns": len(rows),
+        "llm_classified": len(llm_rows),
+        "agreement": (sum(row[SMALL] == row[LARGE] for row in llm_rows) / len(llm_rows)) if llm_rows else None,
+        "response_tiers": {tier: sum(row["response_tier"] == tier for row in rows) for tier in (SMALL, LARGE)},
+        "tiers": tiers,
+        "disagreements": [row for row in llm_rows if row[SMALL] != row[LARGE]],
+    }
+
+def print_report(report: Dict[str, Any]) -> None:
+    fmt = lambda value, spec: "-" if value is None else format(value, spec)
+    print(f"turns: {report['turns']}  classified by LLM: {report['llm_classified']}  "
+          f"small/large agreement: {fmt(report['agreement'], '.1%')}")
+    print(f"router response tiers: {report['response_tiers']}")
+    print(f"{'tier':6} {'model':24} {'calls':>6} {'invalid':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'prompt tok':>11} {'compl tok':>10} {'accuracy':>9}")
+    for tier, row in report["tiers"].items():
+        print(f"{tier:6} {row['model']:24} {row['calls']:>6} {row['invalid_outputs']:>8} "
+              f"{fmt(row['latency_ms_p50'], '.0f'):>8} {fmt(row['latency_ms_p95'], '.0f'):>8} "
+              f"{row['prompt_tokens']:>11} {row['completion_tokens']:>10} {fmt(row['accuracy'], '.1%'):>9}")
+    for row in report["disagreements"]:
+        print(f"  disagree: small={row['small']} large={row['large']}  {row['message']!r}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("corpus")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+    report = asyncio.run(replay(load_corpus(args.corpus), main.client))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
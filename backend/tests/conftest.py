@@ -0,0 +1,48 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import types
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Backend modules are imported top-level, the same way uvicorn loads main:app.
+# main reads knowledge_base.json from the working directory and builds API clients at import.
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(BACKEND_DIR)
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+class StubLLM:
+    """Stands in for the Groq client: classifier prompts get JSON, everything else a short reply"""
+
+    def __init__(self, max_delay: float = 0.002):
+        self.max_delay = max_delay
+        self.chat = types.SimpleNamespace(completions=self)
+
+    async def create(self, model, messages, **params):
+        # Yield like a real network call so concurrent requests interleave
+        await asyncio.sleep(random.random() * self.max_delay)
+        if "intent classification" in messages[0]["content"]:
+            content = json.dumps({"intent": "other", "confidence": 0.9, "entities": {}})
+        else:
+            content = "Happy to help with anything about CCI Global!"
+        message = types.SimpleNamespace(content=content)
+        usage = types.SimpleNamespace(prompt_tokens=100, completion_tokens=20)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=usage)
+
+@pytest.fixture
+def app_main(tmp_path, monkeypatch):
+    """main with a stubbed LLM, empty in-memory state and an (unstarted) sink in tmp_path"""
+    import main
+    from application_sink import ApplicationSink
+
+    monkeypatch.setattr(main.model_router, "client", StubLLM())
+    monkeypatch.setattr(main, "application_sink", ApplicationSink(str(tmp_path / "applications.db"), flush_interval=0.01))
+    for store in (main.conversations, main.customer_data, main.conversation_generations):
+        store.clear()
+    yield main
+    for store in (main.conversations, main.customer_data, main.conversation_generations):
+        store.clear()
@@ -0,0 +1,141 @@
+import asyncio
+import random
+import sqlite3
+
+import httpx
+
+from application_flow import ApplicationStateMachine
+
+POSITION = "Customer Service Representative"
+
+def applicant(i: int):
+    letters = chr(ord('A') + i % 26) + chr(ord('a') + i // 26)
+    return f"Jane {letters}", f"555-010-{i:04d}", f"jane{i}@example.com"
+
+def track_concurrency(main, monkeypatch):
+    """Wrap the engine so the test sees how many turns run at once for a user"""
+    seen = {"active": 0, "max_active": 0}
+    get_response = main.chatbot.get_response
+
+    async def tracked(user_input, customer_info, user_id):
+        seen["active"] += 1
+        seen["max_active"] = max(seen["max_active"], seen["active"])
+        try:
+            return await get_response(user_input, customer_info, user_id)
+        finally:
+            seen["active"] -= 1
+
+    monkeypatch.setattr(main.chatbot, "get_response", tracked)
+    return seen
+
+def stored_applications(main):
+    with sqlite3.connect(main.application_sink.db_path) as conn:
+        return conn.execute("SELECT user_id, name, phone, email FROM applications").fetchall()
+
+async def post_chat(client, user_id: str, message: str):
+    response = await client.post("/chat", json={"message": message, "user_id": user_id})
+    assert response.status_code == 200
+    return response.json()
+
+def test_many_tasks_on_one_user_submit_exactly_one_application(app_main, monkeypatch):
+    main = app_main
+    seen = track_concurrency(main, monkeypatch)
+    main.customer_data["user-1"] = main.CustomerInfo(selected_position=POSITION)
+
+    async def submitter(client, i: int):
+        name, phone, email = applicant(i)
+        for message in ("Yes, apply now!", name, phone, email):
+            await post_chat(client, "user-1", message)
+
+    async def scenario():
+        await main.application_sink.start()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await asyncio.gather(*(submitter(client, i) for i in range(40)))
+        await main.application_sink.stop()
+
+    random.seed(26)
+    asyncio.run(scenario())
+
+    customer = main.customer_data["user-1"]
+    applicants = [applicant(i) for i in range(40)]
+    assert customer.name in [name for name, _, _ in applicants]
+    assert customer.phone in [phone.replace("-", "") for _, phone, _ in applicants]
+    assert customer.email in [email for _, _, email in applicants]
+    assert customer.is_complete
+    assert customer.conversation_context["application_stage"] == "submitted"
+    assert stored_applications(main) == [("user-1", customer.name, customer.phone, customer.email)]
+
+    # Per-user serialization: one turn at a time, and every user message is followed by its own reply
+    assert seen["max_active"] == 1
+    messages = main.conversations["user-1"]
+    assert len(messages) == 40 * 4 * 2
+    assert [m["role"] for m in messages] == ["user", "assistant"] * (40 * 4)
+    assert main.chatbot.application_flow._locks == {}
+
+def test_clear_interleaved_with_chats_keeps_turns_serialized(app_main, monkeypatch):
+    main = app_main
+    seen = track_concurrency(main, monkeypatch)
+
+    async def chatter(client, i: int):
+        for message in ("hello", "Tell me about your services", "Yes, apply now!"):
+            await post_chat(client, "user-3", message)
+
+    async def clearer(client):
+        for _ in range(10):
+            assert (await client.delete("/users/user-3")).status_code == 200
+            await asyncio.sleep(0)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await asyncio.gather(clearer(client), *(chatter(client, i) for i in range(20)), clearer(client))
+
+    random.seed(3)
+    asyncio.run(scenario())
+
+    assert seen["max_active"] == 1
+    messages = main.conversations["user-3"]
+    assert [m["role"] for m in messages] == ["user", "assistant"] * (len(messages) // 2)
+    assert main.chatbot.application_flow._locks == {}
+
+def test_duplicate_apply_while_waiting_for_name_is_not_captured(app_main):
+    main = app_main
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            main.customer_data["user-4"] = main.CustomerInfo(selected_position=POSITION)
+            first = await post_chat(client, "user-4", "Yes, apply now!")
+            duplicate = await post_chat(client, "user-4", "Yes, apply now!")
+            named = await post_chat(client, "user-4", "Jane Doe")
+            return first, duplicate, named
+
+    first, duplicate, named = asyncio.run(scenario())
+
+    assert first["missing_fields"] == ["name"]
+    assert duplicate["missing_fields"] == ["name"]
+    assert named["missing_fields"] == ["phone"]
+    assert main.customer_data["user-4"].name == "Jane Doe"
+
+def test_questions_and_commands_leave_the_flow_to_the_classifier(app_main):
+    flow = ApplicationStateMachine()
+    customer = app_main.CustomerInfo(selected_position=POSITION)
+    assert not flow.handles_turn("What does the application process involve", customer)
+    assert not flow.handles_turn("I saw eyes yesterday", customer)
+    assert flow.handles_turn("Yes, apply now!", customer)
+
+    flow.advance("yes", customer)
+    for user_input in ("Show another position", "Tell me about services", "hello", "What's next?"):
+        assert not flow.handles_turn(user_input, customer)
+        assert flow.advance(user_input, customer) is None
+    assert customer.name is None
+    assert flow.handles_turn("my name is Alice Smith", customer)
+    flow.advance("my name is Alice Smith", customer)
+    assert customer.name == "Alice Smith"
+
+def test_replies_and_repeated_triggers_are_not_names():
+    for user_input in ("Yes, apply now!", "yes, apply", "No, thanks", "Okay, sure", "Hello, anyone there"):
+        assert ApplicationStateMachine._parse_name(user_input) is None
+    for user_input, name in (("Jane Doe", "Jane Doe"), ("Ian", "Ian"), ("I'm Alice Smith.", "Alice Smith")):
+        assert ApplicationStateMachine._parse_name(user_input) == name
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import sqlite3
+
+from application_sink import ApplicationSink
+
+def application(i: int):
+    return {"user_id": f"user-{i}", "position": "Customer Service Representative", "name": "Jane Doe",
+            "phone": "5550100000", "email": f"jane{i}@example.com", "submitted_at": "2025-01-01T00:00:00"}
+
+def count_rows(db_path) -> int:
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM applications").fetchone()[0]
+
+def test_stop_drains_everything_queued(tmp_path):
+    db_path = tmp_path / "applications.db"
+
+    async def main():
+        sink = ApplicationSink(str(db_path), batch_size=50, flush_interval=0.05)
+        await sink.start()
+        results = await asyncio.gather(*(sink.submit(application(i)) for i in range(1000)))
+        await sink.stop()
+        return results
+
+    assert all(asyncio.run(main()))
+    assert count_rows(db_path) == 1000
+
+def test_crashed_worker_is_restarted(tmp_path):
+    db_path = tmp_path / "applications.db"
+
+    async def main():
+        sink = ApplicationSink(str(db_path), flush_interval=0.01)
+        await sink.start()
+        cancelled = sink._worker
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        # A cancelled worker is not restarted...
+        assert sink._worker is cancelled
+
+        async def boom():
+            raise RuntimeError("worker bug")
+        sink._worker = asyncio.create_task(boom())
+        sink._worker.add_done_callback(sink._on_worker_done)
+        await asyncio.sleep(0.01)
+        # ...but one that raised is replaced by a fresh worker
+        assert not sink._worker.done()
+
+        await sink.submit(application(1))
+        await sink.stop()
+
+    asyncio.run(main())
+    assert count_rows(db_path) == 1
+
+def test_stop_does_not_hang_on_full_queue_without_worker(tmp_path):
+    db_path = tmp_path / "applications.db"
+
+    async def main():
+        sink = ApplicationSink(str(db_path), max_queue_size=10)
+        await sink.start()
+        sink._stopping = True  # keep the worker from being restarted
+        sink._worker.cancel()
+        await asyncio.sleep(0)
+        for i in range(10):
+            sink._queue.put_nowait(application(i))
+        sink._stopping = False
+        await asyncio.wait_for(sink.stop(), timeout=2)
+
+    asyncio.run(main())
+    assert count_rows(db_path) == 10
+
+def test_unserializable_payload_does_not_kill_the_worker(tmp_path):
+    db_path = tmp_path / "applications.db"
+
+    async def main():
+        sink = ApplicationSink(str(db_path), flush_interval=0.01)
+        await sink.start()
+        await sink.submit({**application(1), "extra": object()})
+        await asyncio.sleep(0.1)
+        assert not sink._worker.done()
+        await sink.submit(application(2))
+        await sink.stop()
+
+    asyncio.run(main())
+    assert count_rows(db_path) == 2
+
+def test_dropped_applications_go_to_spill_file_not_the_log(tmp_path, caplog):
+    db_path = tmp_path / "applications.db"
+    sink = ApplicationSink(str(db_path), max_queue_size=1, submit_timeout=0.01)
+
+    async def main():
+        assert not await sink.submit(application(0))  # not started
+        await sink.start()
+        sink._stopping = True  # keep the worker from being restarted
+        sink._worker.cancel()
+        await asyncio.sleep(0)
+        sink._stopping = False
+        assert await sink.submit(application(1))
+        assert not await sink.submit(application(2))  # queue full
+
+    with caplog.at_level("ERROR"):
+        asyncio.run(main())
+
+    spilled = [json.loads(line) for line in open(sink.spill_path)]
+    assert [record["user_id"] for record in spilled] == ["user-0", "user-2"]
+    assert "user-2" in caplog.text
+    assert "example.com" not in caplog.text and "Jane Doe" not in caplog.text
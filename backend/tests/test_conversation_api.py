@@ -0,0 +1,90 @@
+from fastapi.testclient import TestClient
+
+def add_messages(main, user_id: str, count: int, content: str = "message"):
+    main.conversations.setdefault(user_id, [])
+    main.conversation_generations.setdefault(user_id, "gen1")
+    for i in range(count):
+        role = "user" if i % 2 == 0 else "assistant"
+        main.conversations[user_id].append({"role": role, "content": f"{content} {i}", "timestamp": "2025-01-01T00:00:00"})
+
+def test_cursor_pages_through_history(app_main):
+    add_messages(app_main, "u1", 7)
+    client = TestClient(app_main.app)
+
+    first = client.get("/conversation/u1", params={"limit": 3}).json()
+    assert [m["content"] for m in first["messages"]] == ["message 0", "message 1", "message 2"]
+    assert first["has_more"] and not first["reset"]
+
+    second = client.get("/conversation/u1", params={"limit": 3, "after": first["next_cursor"]}).json()
+    assert [m["content"] for m in second["messages"]] == ["message 3", "message 4", "message 5"]
+    assert second["has_more"]
+
+    last = client.get("/conversation/u1", params={"limit": 3, "after": second["next_cursor"]}).json()
+    assert [m["content"] for m in last["messages"]] == ["message 6"]
+    assert not last["has_more"]
+
+    # Polling with the final cursor returns nothing new until the history grows
+    idle = client.get("/conversation/u1", params={"after": last["next_cursor"]}).json()
+    assert idle["messages"] == [] and idle["next_cursor"] == last["next_cursor"]
+    assert "last_intent" not in idle["customer_info"]["conversation_context"]
+
+def test_cursor_from_before_delete_restarts_with_reset(app_main):
+    add_messages(app_main, "u2", 6)
+    client = TestClient(app_main.app)
+    stale_cursor = client.get("/conversation/u2").json()["next_cursor"]
+
+    assert client.delete("/users/u2").status_code == 200
+    add_messages(app_main, "u2", 2, content="fresh")
+
+    page = client.get("/conversation/u2", params={"after": stale_cursor}).json()
+    assert page["reset"]
+    assert [m["content"] for m in page["messages"]] == ["fresh 0", "fresh 1"]
+    assert page["next_cursor"].split(".")[0] != stale_cursor.split(".")[0]
+
+    # A cursor past the end of the current generation also restarts
+    generation = page["next_cursor"].split(".")[0]
+    beyond = client.get("/conversation/u2", params={"after": f"{generation}.99"}).json()
+    assert beyond["reset"] and len(beyond["messages"]) == 2
+
+def test_malformed_cursor_is_rejected(app_main):
+    client = TestClient(app_main.app)
+    assert client.get("/conversation/u3", params={"after": "junk"}).status_code == 400
+    assert client.get("/conversation/u3", params={"after": "gen1.-1"}).status_code == 400
+
+def test_etag_conditional_get(app_main):
+    add_messages(app_main, "u4", 2)
+    client = TestClient(app_main.app)
+    response = client.get("/conversation/u4")
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+
+    not_modified = client.get("/conversation/u4", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert client.get("/conversation/u4", headers={"If-None-Match": '"other", ' + etag}).status_code == 304
+    assert client.get("/conversation/u4", headers={"If-None-Match": "*"}).status_code == 304
+
+    add_messages(app_main, "u4", 1, content="new")
+    changed = client.get("/conversation/u4", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+def test_gzip_only_above_minimum_size(app_main):
+    client = TestClient(app_main.app)
+    small = client.get("/conversation/u5", headers={"Accept-Encoding": "gzip"})
+    assert len(small.content) < 500
+    assert "content-encoding" not in small.headers
+
+    add_messages(app_main, "u6", 40, content="a reasonably long chat message about CCI Global services")
+    large = client.get("/conversation/u6", headers={"Accept-Encoding": "gzip"})
+    assert large.headers["content-encoding"] == "gzip"
+    assert len(large.json()["messages"]) == 40
+
+    identity = client.get("/conversation/u6", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+
+def test_chat_response_omits_empty_fields(app_main):
+    client = TestClient(app_main.app)
+    body = client.post("/chat", json={"message": "hello", "user_id": "u7"}).json()
+    assert body["response"]
+    assert "audio_response" not in body
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import types
+
+from model_router import ModelRouter
+
+class StubClient:
+    """Answers with a fixed reply per model name"""
+
+    def __init__(self, replies):
+        self.replies = replies
+        self.models = []
+        self.chat = types.SimpleNamespace(completions=self)
+
+    async def create(self, model, messages, **params):
+        self.models.append(model)
+        message = types.SimpleNamespace(content=self.replies[model])
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+def low_confidence(result):
+    return "low confidence" if result["confidence"] < 0.6 else None
+
+def classify(small_reply, large_reply):
+    client = StubClient({"llama-3.1-8b-instant": small_reply, "llama3-70b-8192": large_reply})
+    router = ModelRouter(client)
+    result = asyncio.run(router.complete("classification", [], validate=json.loads, escalate_if=low_confidence))
+    return result, client.models
+
+def test_confident_small_result_is_used():
+    result, models = classify('{"intent": "greeting", "confidence": 0.9}', "unused")
+    assert result["intent"] == "greeting"
+    assert models == ["llama-3.1-8b-instant"]
+
+def test_low_confidence_large_result_is_returned_not_rejected():
+    result, models = classify('{"intent": "other", "confidence": 0.3}', '{"intent": "support_request", "confidence": 0.4}')
+    assert result == {"intent": "support_request", "confidence": 0.4}
+    assert models == ["llama-3.1-8b-instant", "llama3-70b-8192"]
+
+def test_invalid_small_output_escalates():
+    result, models = classify("not json", '{"intent": "service_inquiry", "confidence": 0.8}')
+    assert result["intent"] == "service_inquiry"
+    assert len(models) == 2
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_response_tier_by_intent_input_and_context():
+    router = ModelRouter(StubClient({}))
+    assert router.choose_tier("response", "greeting", "hi", 3000) == "small"
+    assert router.choose_tier("response", "other", "thanks!", 3000) == "small"
+    assert router.choose_tier("response", "service_inquiry", "What do you offer?", 3000) == "large"
+    assert router.choose_tier("response", "general_career_inquiry", "jobs?", 3000) == "large"
+    assert router.choose_tier("response", "greeting", "x" * 201, 3000) == "large"
+    assert router.choose_tier("response", "greeting", "hi", 4001) == "large"
+
+def test_small_output_that_fails_validation_escalates_responses():
+    client = StubClient({"llama-3.1-8b-instant": "", "llama3-70b-8192": "Hello from the big model"})
+    router = ModelRouter(client)
+
+    def non_empty(content):
+        if not content:
+            raise ValueError("empty response")
+        return content
+
+    result = asyncio.run(router.complete("response", [], intent="greeting", user_input="hi", validate=non_empty))
+    assert result == "Hello from the big model"
+    assert router.stats["small"]["escalations"] == 1
+
+class SlowLargeClient(StubClient):
+    """Advances the router's fake clock by a set latency per large-model call"""
+
+    def __init__(self, clock):
+        super().__init__({"llama-3.1-8b-instant": "small", "llama3-70b-8192": "large"})
+        self.clock = clock
+        self.large_latency_s = 0.0
+
+    async def create(self, model, messages, **params):
+        if model == "llama3-70b-8192":
+            self.clock.now += self.large_latency_s
+        return await super().create(model, messages, **params)
+
+def test_latency_slo_fallback_probes_and_recovers():
+    clock = FakeClock()
+    client = SlowLargeClient(clock)
+    router = ModelRouter(client)
+    router.clock = clock
+    router.latency_slo_ms = 1500
+    router.probe_interval_s = 30
+
+    def respond():
+        # service_inquiry with ~4.5k chars of context: large normally, small while over the SLO
+        return asyncio.run(router.complete("response", [], intent="service_inquiry",
+                                           user_input="What services do you offer?", context_chars=4500))
+
+    client.large_latency_s = 1.6
+    assert respond() == "large"
+    assert router.stats["large"]["ewma_latency_ms"] > 1500
+    assert [respond() for _ in range(5)] == ["small"] * 5
+
+    # Once the measurement is older than the probe interval, exactly one turn re-measures the large tier
+    clock.now += 31
+    client.large_latency_s = 0.6
+    assert respond() == "large"
+    assert abs(router.stats["large"]["ewma_latency_ms"] - 600) < 1
+    assert [respond() for _ in range(3)] == ["large"] * 3
+
+def test_probe_is_rate_limited_while_large_stays_slow():
+    clock = FakeClock()
+    client = SlowLargeClient(clock)
+    router = ModelRouter(client)
+    router.clock = clock
+    router.probe_interval_s = 30
+    client.large_latency_s = 2.0
+    route = lambda: router.choose_tier("response", "service_inquiry", "What services do you offer?", 4500)
+
+    asyncio.run(router.complete("response", [], intent="service_inquiry", context_chars=4500))
+    clock.now += 31
+    assert route() == "large"
+    # The probe is in flight; other turns keep using the small tier until the next interval
+    assert route() == "small"
+    clock.now += 10
+    assert route() == "small"
+
+def test_replay_reports_per_tier_comparison(app_main):
+    import replay_model_router
+
+    class Disagreeing(StubClient):
+        async def create(self, model, messages, **params):
+            intent = "greeting" if model == "llama-3.1-8b-instant" else "other"
+            self.replies = {model: json.dumps({"intent": intent, "confidence": 0.9})}
+            return await super().create(model, messages, **params)
+
+    corpus = replay_model_router.load_corpus("replay_corpus.sample.jsonl")
+    report = asyncio.run(replay_model_router.replay(corpus, Disagreeing({})))
+
+    assert report["turns"] == len(corpus)
+    # The two career messages are answered by keyword rules, without a model call
+    assert report["llm_classified"] == len(corpus) - 2
+    assert report["agreement"] == 0
+    assert report["tiers"]["small"]["calls"] == report["tiers"]["large"]["calls"] == len(corpus) - 2
+    assert report["tiers"]["small"]["latency_ms_p50"] is not None
+    assert sum(report["response_tiers"].values()) == len(corpus)
+    replay_model_router.print_report(report)